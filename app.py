@@ -1,21 +1,33 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, request, jsonify, render_template_string, send_from_directory, send_file, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from pymongo import MongoClient
+from flask_compress import Compress
+from pymongo import MongoClient, InsertOne, UpdateMany, IndexModel
+from pymongo.errors import OperationFailure
 from datetime import datetime
-import difflib
+from rapidfuzz import fuzz, process
+import numpy as np
 import re
 from typing import List, Dict, Tuple
+from collections import defaultdict
+from functools import lru_cache
+from cachetools import TTLCache
+import threading
 import os
+import mmap
+import hashlib
 from dotenv import load_dotenv
 import logging
 import json
+import orjson
 from bson.objectid import ObjectId
-import threading
-import time
-from queue import Queue
-import base64
+from concurrent.futures import ThreadPoolExecutor
+import pybase64
 import uuid
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import HTTPException, NotFound
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import ValueTarget
 
 # Load environment variables
 load_dotenv()
@@ -24,13 +36,51 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson; ObjectIds are written as their hex string"""
+    @staticmethod
+    def _default(obj):
+        if isinstance(obj, ObjectId):
+            return str(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self._default).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self._default), mimetype='application/json')
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
+# JSON (notably embedded base64 photos) is compressed; photo files themselves are already compressed images
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_ALGORITHM_STREAMING'] = ['br', 'deflate']
+app.config['COMPRESS_MIN_SIZE'] = 1024
+Compress(app)
+
+@app.errorhandler(Exception)
+def handle_unexpected_error(e):
+    """JSON 500 for errors a route doesn't handle itself; HTTP errors such as 404/413 keep their status"""
+    if isinstance(e, HTTPException):
+        return e
+    logger.exception(e)
+    return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 # Configurations for uploads
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
+# Portal pages are served with Last-Modified/ETag so repeat loads can be answered with 304
+PORTAL_MAX_AGE = 3600
+# Stored photos are never modified, so browsers and CDNs may keep them for a year
+PHOTO_MAX_AGE = 365 * 24 * 3600
+# Behind nginx/Apache set USE_X_SENDFILE=1 so photo bytes are sent by the proxy instead of the worker
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', '').lower() in ('1', 'true')
 
 # Create uploads directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -38,10 +88,13 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # MongoDB connection
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
 DB_NAME = "simhastha_milaap"
+# One client per worker process; its pool keeps connections warm across requests
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 10))
 
 # Connect to MongoDB
 try:
-    client = MongoClient(MONGODB_URI)
+    client = MongoClient(MONGODB_URI, maxPoolSize=MONGO_MAX_POOL_SIZE, minPoolSize=MONGO_MIN_POOL_SIZE)
     db = client[DB_NAME]
     person_reports = db['person_reports']
     item_reports = db['item_reports']
@@ -51,182 +104,347 @@ try:
 except Exception as e:
     print(f"❌ Error connecting to MongoDB: {e}")
 
-# Notification queue for background processing
-notification_queue = Queue()
+# Optional Redis cache for encoded photos; without REDIS_URL photos are read from disk on every request
+REDIS_URL = os.getenv('REDIS_URL')
+PHOTO_CACHE_TTL = 3600
+redis_client = None
+if REDIS_URL:
+    try:
+        import redis
+        redis_client = redis.Redis.from_url(REDIS_URL)
+        print("✅ Redis cache configured")
+    except Exception as e:
+        print(f"❌ Error configuring Redis: {e}")
+
+def ensure_indexes():
+    """Create the indexes used for match candidates and the listing/stats queries"""
+    # status queries are served by the (status, report_type, created_at) prefix, so it has no index of its own
+    report_indexes = [
+        IndexModel([('status', 1), ('report_type', 1), ('created_at', -1)]),
+        IndexModel([('contact', 1), ('status', 1), ('created_at', -1)]),
+        IndexModel([('has_photos', 1)]),
+    ]
+    wanted = {
+        person_reports: report_indexes + [
+            IndexModel([('name', 'text'), ('description', 'text'), ('location', 'text')],
+                       name='person_text', default_language='none',
+                       # Otherwise a submitted 'language' value MongoDB doesn't know fails the insert
+                       language_override='_text_language'),
+        ],
+        item_reports: report_indexes + [IndexModel([('category_l', 1), ('color_l', 1)])],
+        photos: [IndexModel([('report_id', 1)]), IndexModel([('sha256', 1)])],
+        notifications: [IndexModel([('sent_at', -1)]), IndexModel([('type', 1), ('status', 1)])],
+    }
+    try:
+        for collection, indexes in wanted.items():
+            # Only missing indexes are sent, in one createIndexes command per collection
+            existing = {index['name']: index for index in collection.list_indexes()}
+            for index in indexes:
+                current = existing.get(index.document['name'])
+                # A text index built before language_override was set is rebuilt with it
+                if (current and 'textIndexVersion' in current
+                        and current.get('language_override') != index.document.get('language_override')):
+                    collection.drop_index(index.document['name'])
+                    del existing[index.document['name']]
+            missing = [index for index in indexes if index.document['name'] not in existing]
+            if missing:
+                collection.create_indexes(missing)
+        print("✅ MongoDB indexes ready")
+    except Exception as e:
+        print(f"❌ Error creating MongoDB indexes: {e}")
+
+# Built in the background so an unreachable MongoDB doesn't hold up startup (it shows up in /health instead)
+threading.Thread(target=ensure_indexes, name='ensure-indexes', daemon=True).start()
+
+# Photos up to this size also keep their base64 in the photo document (BSON documents are capped at 16MB)
+INLINE_PHOTO_MAX_BYTES = 4 * 1024 * 1024
+# Photo files are written here while the upload is base64-encoded
+file_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='file')
+# Match notifications are handed to a thread pool so routes never wait on WhatsApp delivery
+notification_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='notif')
+# Twilio sends are network-bound, so a batch is sent on several threads at once
+whatsapp_send_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='whatsapp')
+
+# Twilio configuration is read once; the client (and its HTTP session) is shared by every send
+TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
+TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
+TWILIO_WHATSAPP_NUMBER = os.getenv('TWILIO_WHATSAPP_NUMBER')
+TWILIO_CONFIGURED = all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_NUMBER])
+if TWILIO_CONFIGURED and not TWILIO_WHATSAPP_NUMBER.startswith('whatsapp:'):
+    TWILIO_WHATSAPP_NUMBER = f'whatsapp:{TWILIO_WHATSAPP_NUMBER}'
+
+_twilio_client = None
+if TWILIO_CONFIGURED:
+    try:
+        from twilio.rest import Client
+        _twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    except Exception as e:
+        print(f"❌ Error creating Twilio client: {e}")
+
+_OBJECTID_RE = re.compile(r'^[a-f0-9]{24}$')
+
+# Keyword tokenizer: words of 3+ characters, minus common stopwords
+_WORD_RE = re.compile(r'\b\w{3,}\b')
+_STOPWORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'was', 'are', 'were'})
+
+# Keyword scores for (new report id, existing report id) pairs. Keyword score is the fraction of the
+# *new* report's keywords matched, so the key is ordered rather than a symmetric pair.
+_keyword_score_cache = TTLCache(maxsize=100_000, ttl=3600)
+_keyword_score_cache_lock = threading.Lock()
 
 # AI-powered matching algorithms
 class SmartMatcher:
+    # Text fields compared case-insensitively; the lowered copy is kept on the report as '<field>_l'
+    NORMALIZED_FIELDS = ('name', 'gender', 'location', 'category', 'color', 'brand')
+    # Per-field weights; a pair's score is the weighted mean over the fields both reports filled in
+    PERSON_WEIGHTS = {'name': 0.4, 'age': 0.2, 'gender': 0.2, 'description': 0.2, 'location': 0.2}
+    ITEM_WEIGHTS = {'category': 0.25, 'color': 0.25, 'brand': 0.2, 'description': 0.15, 'location': 0.1}
+    MATCH_THRESHOLD = 0.55
+    MAX_MATCHES = 5
+
     @staticmethod
-    def calculate_similarity(str1: str, str2: str) -> float:
-        return difflib.SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
+    def normalize_report(report: Dict) -> Dict:
+        """Store lowered copies of the compared fields and the description keywords so matching skips re-tokenising"""
+        for field in SmartMatcher.NORMALIZED_FIELDS:
+            if report.get(field):
+                report[f'{field}_l'] = str(report[field]).lower()
+        report['_kw'] = SmartMatcher.extract_keywords(report.get('description') or '')
+        return report
+
+    @staticmethod
+    def normalized(report: Dict, field: str) -> str:
+        key = f'{field}_l'
+        if key not in report:
+            report[key] = str(report[field]).lower()
+        return report[key]
+    
+    @staticmethod
+    def keywords(report: Dict) -> List[str]:
+        if '_kw' not in report:
+            report['_kw'] = SmartMatcher.extract_keywords(report.get('description') or '')
+        return report['_kw']
     
     @staticmethod
     def extract_keywords(text: str) -> List[str]:
-        common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'was', 'are', 'were'}
-        words = re.findall(r'\b\w+\b', text.lower())
-        return [word for word in words if word not in common_words and len(word) > 2]
+        return [word for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS]
     
     @staticmethod
-    def match_persons(new_person: Dict, existing_persons: List[Dict]) -> List[Tuple[Dict, float]]:
-        matches = []
-        
-        for existing in existing_persons:
-            if new_person['report_type'] == existing['report_type']:
-                continue
-                
-            score = 0.0
-            factors = 0
-            
-            # Name similarity
-            if new_person.get('name') and existing.get('name'):
-                name_sim = SmartMatcher.calculate_similarity(new_person['name'], existing['name'])
-                if name_sim > 0.6:
-                    score += name_sim * 0.4
-                    factors += 1
-            
-            # Age matching
-            if new_person.get('age') and existing.get('age'):
+    def keyword_score(new_keywords: List[str], existing_keywords: frozenset) -> float:
+        """Fraction of new_keywords that match an existing keyword exactly or with similarity > 0.7"""
+        new_set = frozenset(new_keywords)
+        # Same (or fully contained) description, e.g. a person reported twice: every token is an exact hit
+        if new_set <= existing_keywords:
+            return 1.0
+        # Exact overlap is a set intersection; only the distinct leftover tokens need a fuzzy lookup
+        hits = set(new_set & existing_keywords)
+        for new_kw in new_set - existing_keywords:
+            if SmartMatcher.fuzzy_keyword_hit(new_kw, existing_keywords):
+                hits.add(new_kw)
+        return sum(1 for new_kw in new_keywords if new_kw in hits) / len(new_keywords)
+    
+    @staticmethod
+    @lru_cache(maxsize=1 << 16)
+    def fuzzy_keyword_hit(keyword: str, candidates: frozenset) -> bool:
+        """Whether keyword has similarity > 0.7 with any candidate; cached because the same tokens and reports recur across submissions"""
+        best = process.extractOne(keyword, candidates, scorer=fuzz.ratio, score_cutoff=70)
+        return best is not None and best[1] > 70
+    
+    @staticmethod
+    def _field_similarity(new_batch: List[Dict], existing: List[Dict], field: str, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Pairwise similarity for one text field (0 where not above threshold) and the mask of pairs where both have it"""
+        new_values = [SmartMatcher.normalized(r, field) if r.get(field) else '' for r in new_batch]
+        existing_values = [SmartMatcher.normalized(r, field) if r.get(field) else '' for r in existing]
+        # Single-threaded: the matrices are small (1 x <=200 per submission), and concurrent requests
+        # already spread over the server's worker threads
+        sims = process.cdist(new_values, existing_values, scorer=fuzz.ratio, score_cutoff=threshold * 100,
+                             dtype=np.float64) / 100.0
+        present = np.array([bool(v) for v in new_values])[:, None] & np.array([bool(v) for v in existing_values])[None, :]
+        sims[~present | (sims <= threshold)] = 0.0
+        return sims, present
+    
+    @staticmethod
+    def _field_equal(new_batch: List[Dict], existing: List[Dict], field: str) -> Tuple[np.ndarray, np.ndarray]:
+        new_values = np.array([SmartMatcher.normalized(r, field) if r.get(field) else '' for r in new_batch])
+        existing_values = np.array([SmartMatcher.normalized(r, field) if r.get(field) else '' for r in existing])
+        present = (new_values != '')[:, None] & (existing_values != '')[None, :]
+        return (present & (new_values[:, None] == existing_values[None, :])).astype(np.float64), present
+    
+    @staticmethod
+    def _ages(reports: List[Dict]) -> np.ndarray:
+        ages = np.full(len(reports), np.nan)
+        for i, report in enumerate(reports):
+            if report.get('age'):
                 try:
-                    age_diff = abs(int(new_person['age']) - int(existing['age']))
-                    if age_diff <= 5:
-                        age_score = 1.0 - (age_diff * 0.1)
-                        score += age_score * 0.2
-                        factors += 1
-                except:
+                    ages[i] = int(report['age'])
+                except (TypeError, ValueError):
                     pass
-            
-            # Gender matching
-            if new_person.get('gender') and existing.get('gender'):
-                if new_person['gender'].lower() == existing['gender'].lower():
-                    score += 0.2
-                    factors += 1
-            
-            # Description keyword matching
-            if new_person.get('description') and existing.get('description'):
-                new_keywords = SmartMatcher.extract_keywords(new_person['description'])
-                existing_keywords = SmartMatcher.extract_keywords(existing['description'])
-                
-                if new_keywords and existing_keywords:
-                    keyword_matches = 0
-                    for new_kw in new_keywords:
-                        for existing_kw in existing_keywords:
-                            if SmartMatcher.calculate_similarity(new_kw, existing_kw) > 0.7:
-                                keyword_matches += 1
-                                break
-                    
-                    if len(new_keywords) > 0:
-                        desc_score = keyword_matches / len(new_keywords)
-                        score += desc_score * 0.2
-                        factors += 1
-            
-            # Location similarity
-            if new_person.get('location') and existing.get('location'):
-                location_sim = SmartMatcher.calculate_similarity(new_person['location'], existing['location'])
-                if location_sim > 0.4:
-                    score += location_sim * 0.2
-                    factors += 1
-            
-            if factors > 0:
-                final_score = score / factors
-                if final_score > 0.55:
-                    matches.append((existing, final_score))
+        return ages
+    
+    @staticmethod
+    def _age_similarity(new_batch: List[Dict], existing: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        new_ages = SmartMatcher._ages(new_batch)
+        existing_ages = SmartMatcher._ages(existing)
+        present = ~np.isnan(new_ages)[:, None] & ~np.isnan(existing_ages)[None, :]
+        age_diff = np.abs(new_ages[:, None] - existing_ages[None, :])
+        return np.where(age_diff <= 5, 1.0 - age_diff * 0.1, 0.0), present
+    
+    @staticmethod
+    def _keyword_similarity(new_batch: List[Dict], existing: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.zeros((len(new_batch), len(existing)))
+        present = np.zeros(scores.shape, dtype=bool)
+        existing_keywords = [frozenset(SmartMatcher.keywords(r)) for r in existing]
+        existing_ids = [str(r['_id']) if '_id' in r else None for r in existing]
+        for i, new_report in enumerate(new_batch):
+            new_keywords = SmartMatcher.keywords(new_report)
+            if not new_keywords:
+                continue
+            new_id = str(new_report['_id']) if '_id' in new_report else None
+            for j, keywords in enumerate(existing_keywords):
+                if not keywords:
+                    continue
+                present[i, j] = True
+                key = (new_id, existing_ids[j]) if new_id and existing_ids[j] else None
+                cached = None
+                if key:
+                    with _keyword_score_cache_lock:
+                        cached = _keyword_score_cache.get(key)
+                if cached is None:
+                    cached = SmartMatcher.keyword_score(new_keywords, keywords)
+                    if key:
+                        with _keyword_score_cache_lock:
+                            _keyword_score_cache[key] = cached
+                scores[i, j] = cached
+        return scores, present
+    
+    @staticmethod
+    def _accumulate(score: np.ndarray, weight_total: np.ndarray, present: np.ndarray, weight: float, values: np.ndarray):
+        """score += weight * values and weight_total += weight where both reports have the field, in place"""
+        values *= weight
+        np.add(score, values, out=score, where=present)
+        np.add(weight_total, weight, out=weight_total, where=present)
+    
+    @staticmethod
+    def _top_matches(new_batch: List[Dict], existing: List[Dict], score: np.ndarray, weight_total: np.ndarray) -> List[List[Tuple[Dict, float]]]:
+        new_types = np.array([str(r.get('report_type')) for r in new_batch])
+        existing_types = np.array([str(r.get('report_type')) for r in existing])
+        # Weighted mean over the fields both reports have, so the threshold means the same however many are filled in
+        with np.errstate(divide='ignore', invalid='ignore'):
+            final = score / weight_total
+        eligible = (new_types[:, None] != existing_types[None, :]) & (weight_total > 0) & (final > SmartMatcher.MATCH_THRESHOLD)
         
-        matches.sort(key=lambda x: x[1], reverse=True)
-        return matches[:5]
+        k = SmartMatcher.MAX_MATCHES
+        results = []
+        for row, mask in zip(final, eligible):
+            idx = np.flatnonzero(mask)
+            if len(idx) > k:
+                # O(N) selection of the k best; ties at the cut keep the earliest candidates
+                scores = row[idx]
+                kth = -np.partition(-scores, k - 1)[k - 1]
+                above = idx[scores > kth]
+                idx = np.concatenate([above, idx[scores == kth][:k - len(above)]])
+                idx.sort()
+            idx = idx[np.argsort(-row[idx], kind='stable')]
+            results.append([(existing[j], float(row[j])) for j in idx])
+        return results
+    
+    @staticmethod
+    def match_persons(new_person: Dict, existing_persons: List[Dict]) -> List[Tuple[Dict, float]]:
+        return SmartMatcher.match_persons_batch([new_person], existing_persons)[0]
+    
+    @staticmethod
+    def match_persons_batch(new_batch: List[Dict], existing_persons: List[Dict]) -> List[List[Tuple[Dict, float]]]:
+        """Score every new report against every existing one in a single pass"""
+        if not new_batch or not existing_persons:
+            return [[] for _ in new_batch]
+        
+        weights = SmartMatcher.PERSON_WEIGHTS
+        score = np.zeros((len(new_batch), len(existing_persons)))
+        weight_total = np.zeros(score.shape)
+        
+        # Name similarity
+        name_sim, present = SmartMatcher._field_similarity(new_batch, existing_persons, 'name', 0.6)
+        SmartMatcher._accumulate(score, weight_total, present, weights['name'], name_sim)
+        
+        # Age matching
+        age_score, present = SmartMatcher._age_similarity(new_batch, existing_persons)
+        SmartMatcher._accumulate(score, weight_total, present, weights['age'], age_score)
+        
+        # Gender matching
+        gender_match, present = SmartMatcher._field_equal(new_batch, existing_persons, 'gender')
+        SmartMatcher._accumulate(score, weight_total, present, weights['gender'], gender_match)
+        
+        # Description keyword matching
+        desc_score, present = SmartMatcher._keyword_similarity(new_batch, existing_persons)
+        SmartMatcher._accumulate(score, weight_total, present, weights['description'], desc_score)
+        
+        # Location similarity
+        location_sim, present = SmartMatcher._field_similarity(new_batch, existing_persons, 'location', 0.4)
+        SmartMatcher._accumulate(score, weight_total, present, weights['location'], location_sim)
+        
+        return SmartMatcher._top_matches(new_batch, existing_persons, score, weight_total)
     
     @staticmethod
     def match_items(new_item: Dict, existing_items: List[Dict]) -> List[Tuple[Dict, float]]:
-        matches = []
+        return SmartMatcher.match_items_batch([new_item], existing_items)[0]
+    
+    @staticmethod
+    def match_items_batch(new_batch: List[Dict], existing_items: List[Dict]) -> List[List[Tuple[Dict, float]]]:
+        """Score every new report against every existing one in a single pass"""
+        if not new_batch or not existing_items:
+            return [[] for _ in new_batch]
         
-        for existing in existing_items:
-            if new_item['report_type'] == existing['report_type']:
-                continue
-                
-            score = 0.0
-            factors = 0
-            
-            # Category similarity
-            if new_item.get('category') and existing.get('category'):
-                category_sim = SmartMatcher.calculate_similarity(new_item['category'], existing['category'])
-                if category_sim > 0.6:
-                    score += category_sim * 0.25
-                    factors += 1
-            
-            # Color similarity
-            if new_item.get('color') and existing.get('color'):
-                color_sim = SmartMatcher.calculate_similarity(new_item['color'], existing['color'])
-                if color_sim > 0.6:
-                    score += color_sim * 0.25
-                    factors += 1
-            
-            # Brand/Model similarity
-            if new_item.get('brand') and existing.get('brand'):
-                brand_sim = SmartMatcher.calculate_similarity(new_item['brand'], existing['brand'])
-                if brand_sim > 0.6:
-                    score += brand_sim * 0.2
-                    factors += 1
-            
-            # Description matching
-            if new_item.get('description') and existing.get('description'):
-                desc_keywords_new = SmartMatcher.extract_keywords(new_item['description'])
-                desc_keywords_existing = SmartMatcher.extract_keywords(existing['description'])
-                
-                if desc_keywords_new and desc_keywords_existing:
-                    keyword_matches = 0
-                    for new_kw in desc_keywords_new:
-                        for existing_kw in desc_keywords_existing:
-                            if SmartMatcher.calculate_similarity(new_kw, existing_kw) > 0.7:
-                                keyword_matches += 1
-                                break
-                    
-                    if len(desc_keywords_new) > 0:
-                        desc_score = keyword_matches / len(desc_keywords_new)
-                        score += desc_score * 0.15
-                        factors += 1
-            
-            # Location proximity
-            if new_item.get('location') and existing.get('location'):
-                location_sim = SmartMatcher.calculate_similarity(new_item['location'], existing['location'])
-                if location_sim > 0.4:
-                    score += location_sim * 0.1
-                    factors += 1
-            
-            # Calculate final score
-            if factors > 0:
-                final_score = score / factors
-                if final_score > 0.55:
-                    matches.append((existing, final_score))
+        weights = SmartMatcher.ITEM_WEIGHTS
+        score = np.zeros((len(new_batch), len(existing_items)))
+        weight_total = np.zeros(score.shape)
+        
+        # Category, color and brand/model similarity
+        for field in ('category', 'color', 'brand'):
+            sims, present = SmartMatcher._field_similarity(new_batch, existing_items, field, 0.6)
+            SmartMatcher._accumulate(score, weight_total, present, weights[field], sims)
+        
+        # Description matching
+        desc_score, present = SmartMatcher._keyword_similarity(new_batch, existing_items)
+        SmartMatcher._accumulate(score, weight_total, present, weights['description'], desc_score)
+        
+        # Location proximity
+        location_sim, present = SmartMatcher._field_similarity(new_batch, existing_items, 'location', 0.4)
+        SmartMatcher._accumulate(score, weight_total, present, weights['location'], location_sim)
         
-        matches.sort(key=lambda x: x[1], reverse=True)
-        return matches[:5]
+        return SmartMatcher._top_matches(new_batch, existing_items, score, weight_total)
 
 # WhatsApp Handler with Twilio Integration
 class WhatsAppHandler:
+    # Checked in order: (any of these phrases, unless this word is present, reply)
+    MESSAGE_ROUTES = (
+        (('hello', 'hi', 'hey', 'namaste'), None,
+         "Namaste! Welcome to Simhastha Milaap Lost & Found System. 🙏\n\nHow can we help you today?\n1. Report missing person - Type 'MISSING'\n2. Report found person - Type 'FOUND PERSON'\n3. Report lost item - Type 'LOST'\n4. Report found item - Type 'FOUND ITEM'\n\nYou can also reply with your Report ID to get status."),
+        (('missing',), None,
+         "To report a missing person, please visit our portal or reply with details in this format:\nName, Age, Gender, Description, Last seen location, Your WhatsApp number"),
+        (('found person',), None,
+         "To report a found person, please share details in this format:\nName (if known), Approx Age, Gender, Description, Current location, Your WhatsApp number"),
+        (('lost',), 'item',
+         "To report a lost item, please reply:\nCategory, Color, Brand/Model, Description, Last seen location, Your WhatsApp number"),
+        (('found item',), None,
+         "To report a found item, please reply:\nCategory, Color, Brand/Model, Description, Found location, Your WhatsApp number"),
+    )
+    
     @staticmethod
     def send_whatsapp_message(to_number, message_body):
         """Send WhatsApp message using Twilio"""
         try:
-            # Check if Twilio is configured
-            account_sid = os.getenv('TWILIO_ACCOUNT_SID')
-            auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-            twilio_number = os.getenv('TWILIO_WHATSAPP_NUMBER')
-            
-            if not all([account_sid, auth_token, twilio_number]):
+            if not TWILIO_CONFIGURED:
                 print(f"📱 WhatsApp simulation to {to_number}:\n{message_body}")
                 return True
             
-            from twilio.rest import Client
+            if _twilio_client is None:
+                raise RuntimeError("Twilio client unavailable")
             
             if not to_number.startswith('whatsapp:'):
                 to_number = f'whatsapp:{to_number}'
             
-            if not twilio_number.startswith('whatsapp:'):
-                twilio_number = f'whatsapp:{twilio_number}'
-            
-            client = Client(account_sid, auth_token)
-            message = client.messages.create(
+            message = _twilio_client.messages.create(
                 body=message_body,
-                from_=twilio_number,
+                from_=TWILIO_WHATSAPP_NUMBER,
                 to=to_number
             )
             
@@ -253,118 +471,235 @@ class WhatsAppHandler:
             })
             
             message_body = message_body.strip().lower()
-            response = ""
+            for phrases, excluded, reply in WhatsAppHandler.MESSAGE_ROUTES:
+                if any(phrase in message_body for phrase in phrases) and not (excluded and excluded in message_body):
+                    return reply
             
-            if any(word in message_body for word in ['hello', 'hi', 'hey', 'namaste']):
-                response = "Namaste! Welcome to Simhastha Milaap Lost & Found System. 🙏\n\nHow can we help you today?\n1. Report missing person - Type 'MISSING'\n2. Report found person - Type 'FOUND PERSON'\n3. Report lost item - Type 'LOST'\n4. Report found item - Type 'FOUND ITEM'\n\nYou can also reply with your Report ID to get status."
-            elif "missing" in message_body:
-                response = "To report a missing person, please visit our portal or reply with details in this format:\nName, Age, Gender, Description, Last seen location, Your WhatsApp number"
-            elif "found person" in message_body:
-                response = "To report a found person, please share details in this format:\nName (if known), Approx Age, Gender, Description, Current location, Your WhatsApp number"
-            elif "lost" in message_body and "item" not in message_body:
-                response = "To report a lost item, please reply:\nCategory, Color, Brand/Model, Description, Last seen location, Your WhatsApp number"
-            elif "found item" in message_body:
-                response = "To report a found item, please reply:\nCategory, Color, Brand/Model, Description, Found location, Your WhatsApp number"
-            elif re.match(r'^[a-f0-9]{24}$', message_body):
-                response = f"Looking up status for Report ID: {message_body}.\nPlease check the portal; if there's a match, we'll notify you here."
-            else:
-                response = "Sorry, I didn't understand. Please say 'Namaste' to see options or share your Report ID."
-            
-            return response
+            if _OBJECTID_RE.match(message_body):
+                return f"Looking up status for Report ID: {message_body}.\nPlease check the portal; if there's a match, we'll notify you here."
+            return "Sorry, I didn't understand. Please say 'Namaste' to see options or share your Report ID."
         except Exception as e:
             print(f"❌ Error processing incoming message: {e}")
             return "We encountered an error. Please try again later."
 
 class WhatsAppNotifier:
+    PERSON_MATCH_TEMPLATE = (
+        "✅ Potential MATCH found for your missing person report!\n\n"
+        "Name: {name} (approx age {age})\n"
+        "Gender: {gender}\n"
+        "Description: {description}\n"
+        "Location: {location}\n"
+        "Found report contact: {contact}\n\n"
+        "Similarity Score: {similarity_score}%\n\n"
+        "Please contact our help center for verification: +91-XXXXXXXXXX\n"
+        "Reference ID: {reference_id}"
+    )
+    ITEM_MATCH_TEMPLATE = (
+        "✅ Potential MATCH found for your lost item report!\n\n"
+        "Category: {category} | Color: {color} | Brand: {brand}\n"
+        "Description: {description}\n"
+        "Location: {location}\n"
+        "Found by contact: {contact}\n\n"
+        "Similarity Score: {similarity_score}%\n\n"
+        "Please contact our help center for verification: +91-XXXXXXXXXX\n"
+        "Reference ID: {reference_id}"
+    )
+    
+    @staticmethod
+    def build_match_message(match_type, match_details, similarity_score, report_id):
+        fields = defaultdict(lambda: 'N/A', match_details)
+        fields['similarity_score'] = similarity_score
+        fields['reference_id'] = report_id
+        template = WhatsAppNotifier.PERSON_MATCH_TEMPLATE if match_type == 'person' else WhatsAppNotifier.ITEM_MATCH_TEMPLATE
+        return template.format_map(fields)
+    
     @staticmethod
     def send_match_notification(contact_number, match_type, match_details, similarity_score, report_id):
+        return WhatsAppNotifier.send_match_notifications([{
+            'contact_number': contact_number,
+            'match_type': match_type,
+            'match_details': match_details,
+            'similarity_score': similarity_score,
+            'report_id': report_id
+        }])[0]
+    
+    @staticmethod
+    def send_match_notifications(batch):
+        """Log a batch of match alerts with one bulk insert, send them concurrently, then record outcomes in one bulk update"""
         try:
-            if match_type == 'person':
-                message = "✅ Potential MATCH found for your missing person report!\n\n"
-                message += f"Name: {match_details.get('name','N/A')} (approx age {match_details.get('age','N/A')})\n"
-                message += f"Gender: {match_details.get('gender','N/A')}\n"
-                message += f"Description: {match_details.get('description','N/A')}\n"
-                message += f"Location: {match_details.get('location','N/A')}\n"
-                message += f"Found report contact: {match_details.get('contact','N/A')}\n\n"
-                message += f"Similarity Score: {similarity_score}%\n\n"
-                message += f"Please contact our help center for verification: +91-XXXXXXXXXX\n"
-                message += f"Reference ID: {report_id}"
-            else:
-                message = "✅ Potential MATCH found for your lost item report!\n\n"
-                message += f"Category: {match_details.get('category','N/A')} | Color: {match_details.get('color','N/A')} | Brand: {match_details.get('brand','N/A')}\n"
-                message += f"Description: {match_details.get('description','N/A')}\n"
-                message += f"Location: {match_details.get('location','N/A')}\n"
-                message += f"Found by contact: {match_details.get('contact','N/A')}\n\n"
-                message += f"Similarity Score: {similarity_score}%\n\n"
-                message += f"Please contact our help center for verification: +91-XXXXXXXXXX\n"
-                message += f"Reference ID: {report_id}"
-            
-            print(f"💬 Message content: {message[:100]}.")
-            
-            notification_id = notifications.insert_one({
-                'type': 'match_alert',
-                'contact_number': contact_number,
-                'message': message,
-                'status': 'pending',
-                'sent_at': datetime.now(),
-                'match_type': match_type,
-                'similarity_score': similarity_score,
-                'report_id': report_id
-            }).inserted_id
+            docs = []
+            for notification_data in batch:
+                message = WhatsAppNotifier.build_match_message(
+                    notification_data['match_type'],
+                    notification_data['match_details'],
+                    notification_data['similarity_score'],
+                    notification_data.get('report_id', 'N/A')
+                )
+                print(f"💬 Message content: {message[:100]}.")
+                docs.append({
+                    'type': 'match_alert',
+                    'contact_number': notification_data['contact_number'],
+                    'message': message,
+                    'status': 'pending',
+                    'sent_at': datetime.now(),
+                    'match_type': notification_data['match_type'],
+                    'similarity_score': notification_data['similarity_score'],
+                    'report_id': notification_data.get('report_id', 'N/A')
+                })
             
-            print(f"📝 Notification logged in DB with ID: {notification_id}")
+            # InsertOne assigns each doc its _id in place
+            notifications.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+            print(f"📝 {len(docs)} notification(s) logged in DB")
             
-            success = WhatsAppHandler.send_whatsapp_message(contact_number, message)
+            results = list(whatsapp_send_pool.map(
+                lambda doc: WhatsAppHandler.send_whatsapp_message(doc['contact_number'], doc['message']), docs))
             
-            if success:
-                notifications.update_one(
-                    {'_id': notification_id},
-                    {'$set': {'status': 'sent'}}
-                )
-                print(f"✅ Notification sent successfully to {contact_number}")
-            else:
-                notifications.update_one(
-                    {'_id': notification_id},
-                    {'$set': {'status': 'failed'}}
-                )
-                print(f"❌ Failed to send notification to {contact_number}")
+            sent_ids = [doc['_id'] for doc, success in zip(docs, results) if success]
+            failed_ids = [doc['_id'] for doc, success in zip(docs, results) if not success]
+            updates = []
+            if sent_ids:
+                updates.append(UpdateMany({'_id': {'$in': sent_ids}}, {'$set': {'status': 'sent'}}))
+            if failed_ids:
+                updates.append(UpdateMany({'_id': {'$in': failed_ids}}, {'$set': {'status': 'failed'}}))
+            if updates:
+                notifications.bulk_write(updates, ordered=False)
+            print(f"✅ Notifications sent: {len(sent_ids)}, failed: {len(failed_ids)}")
             
-            return success
+            return results
         except Exception as e:
-            print(f"🔥 Error sending WhatsApp notification: {e}")
-            return False
+            print(f"🔥 Error sending WhatsApp notifications: {e}")
+            return [False] * len(batch)
+
+# Upper bound on reports pulled from MongoDB for scoring against a new submission
+MATCH_CANDIDATE_LIMIT = 200
+# Fewer text-search hits than this and person matching falls back to recent reports as well
+TEXT_CANDIDATE_MIN = 20
+
+# Only the fields the matcher and match notifications read
+PERSON_MATCH_PROJECTION = {field: 1 for field in (
+    'report_type', 'name', 'age', 'gender', 'description', 'location', 'contact',
+    'name_l', 'gender_l', 'location_l', '_kw'
+)}
+ITEM_MATCH_PROJECTION = {field: 1 for field in (
+    'report_type', 'category', 'color', 'brand', 'description', 'location', 'contact',
+    'category_l', 'color_l', 'brand_l', 'location_l', '_kw'
+)}
 
-# Background notification worker
-def notification_worker():
-    """Background process to handle notifications"""
-    while True:
+# Fields the matcher keeps for itself (normalized caches, text-search score); clients never see them
+REPORT_INTERNAL_FIELDS = frozenset([f'{field}_l' for field in SmartMatcher.NORMALIZED_FIELDS] + ['_kw', 'text_score'])
+# Listings leave out the matcher's internal fields
+REPORT_LISTING_PROJECTION = {field: 0 for field in REPORT_INTERNAL_FIELDS}
+# ... and photo listings the storage-only fields
+PHOTO_LISTING_PROJECTION = {'filepath': 0, 'b64': 0, 'sha256': 0}
+
+def client_report(report):
+    """Copy of a report without the matcher's internal fields, for responses and notifications"""
+    return {key: value for key, value in report.items() if key not in REPORT_INTERNAL_FIELDS}
+
+def person_candidates(person):
+    """Active opposite-type person reports sharing a name/location/description term, topped up with recent ones"""
+    terms = (re.findall(r'\w+', SmartMatcher.normalized(person, 'name'))
+             + re.findall(r'\w+', SmartMatcher.normalized(person, 'location'))
+             + SmartMatcher.keywords(person))
+    base_query = {'status': 'active', 'report_type': {'$ne': person['report_type']}}
+    candidates = []
+    if terms:
+        cursor = person_reports.find({**base_query, '$text': {'$search': ' '.join(terms)}},
+                                     {**PERSON_MATCH_PROJECTION, 'text_score': {'$meta': 'textScore'}}) \
+            .sort([('text_score', {'$meta': 'textScore'})]).limit(MATCH_CANDIDATE_LIMIT)
         try:
-            notification_data = notification_queue.get()
-            if notification_data is None:
-                break
-            WhatsAppNotifier.send_match_notification(
-                notification_data['contact_number'],
-                notification_data['match_type'],
-                notification_data['match_details'],
-                notification_data['similarity_score'],
-                notification_data.get('report_id', 'N/A')
-            )
-            notification_queue.task_done()
-        except Exception as e:
-            print(f"Error in notification worker: {e}")
-            time.sleep(5)
+            candidates = list(cursor)
+        except OperationFailure as e:
+            # No text index yet (still building, or startup couldn't reach MongoDB): recent reports only
+            print(f"❌ Text search unavailable, using recent reports: {e}")
+    # $text only admits exact token hits, so near-miss spellings ("Rames" vs "Ramesh") would never be
+    # scored; when it finds few, the most recent reports are added for the fuzzy matcher to judge
+    if len(candidates) < TEXT_CANDIDATE_MIN:
+        seen = [candidate['_id'] for candidate in candidates]
+        candidates += person_reports.find({**base_query, '_id': {'$nin': seen}}, PERSON_MATCH_PROJECTION) \
+            .sort('created_at', -1).limit(MATCH_CANDIDATE_LIMIT - len(candidates))
+    return candidates
+
+def item_candidates(item):
+    """Active opposite-type item reports in the same category"""
+    query = {
+        'status': 'active',
+        'report_type': {'$ne': item['report_type']},
+        'category_l': SmartMatcher.normalized(item, 'category')
+    }
+    return list(item_reports.find(query, ITEM_MATCH_PROJECTION).sort('created_at', -1).limit(MATCH_CANDIDATE_LIMIT))
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+def parse_photo_upload():
+    """Parse the multipart upload body in 64KB chunks; returns (report_id, report_type, photo target)"""
+    parser = StreamingFormDataParser(headers={'Content-Type': request.content_type or ''})
+    report_id, report_type, photo = ValueTarget(), ValueTarget(), ValueTarget()
+    parser.register('report_id', report_id)
+    parser.register('report_type', report_type)
+    parser.register('photo', photo)
+    # request.stream still enforces MAX_CONTENT_LENGTH
+    while chunk := request.stream.read(UPLOAD_CHUNK_SIZE):
+        parser.data_received(chunk)
+    return report_id.value.decode('utf-8'), report_type.value.decode('utf-8'), photo
+
+def write_photo_file(filepath, file_bytes):
+    """Write via a temp file and rename, so filepath only ever exists as a complete file"""
+    tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'wb') as out_file:
+            out_file.write(file_bytes)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def cache_photo_data(image_data_by_id):
+    """Store base64 photo payloads in Redis, keyed photo:<photo_id>"""
+    if redis_client is None or not image_data_by_id:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for photo_id, image_data in image_data_by_id.items():
+            pipe.setex(f"photo:{photo_id}", PHOTO_CACHE_TTL, image_data)
+        pipe.execute()
+    except Exception as e:
+        print(f"❌ Error caching photos: {e}")
+
+def cached_photo_data(photo_ids):
+    """Base64 payloads for photo_ids from Redis in one MGET; None for each miss"""
+    if redis_client is None or not photo_ids:
+        return [None] * len(photo_ids)
+    try:
+        values = redis_client.mget([f"photo:{photo_id}" for photo_id in photo_ids])
+        return [value.decode('ascii') if value is not None else None for value in values]
+    except Exception as e:
+        print(f"❌ Error reading cached photos: {e}")
+        return [None] * len(photo_ids)
+
+# The dashboard's reports-with-photos JSON is cached briefly and dropped whenever a report gains photos or changes status
+REPORTS_WITH_PHOTOS_CACHE_KEY = 'reports:with_photos:v1'
+REPORTS_WITH_PHOTOS_CACHE_TTL = 60
+
+def invalidate_reports_with_photos():
+    if redis_client is None:
+        return
+    try:
+        redis_client.delete(REPORTS_WITH_PHOTOS_CACHE_KEY)
+    except Exception as e:
+        print(f"❌ Error invalidating reports cache: {e}")
+
 # Routes
 @app.route('/')
 def home():
     try:
-        with open('index.html', 'r', encoding='utf-8') as file:
-            return file.read()
-    except FileNotFoundError:
+        return send_from_directory(app.root_path, 'index.html', max_age=PORTAL_MAX_AGE)
+    except NotFound:
         return "Simhastha Milaap - Smart Lost & Found System"
 
 @app.route('/submit_person', methods=['POST'])
@@ -378,14 +713,14 @@ def submit_person():
         data['status'] = 'active'
         data['created_at'] = datetime.now()
         data['has_photos'] = False
+        SmartMatcher.normalize_report(data)
         
+        # Insert before reading candidates: of two complementary reports submitted together,
+        # the later query is then guaranteed to see the other report. The opposite-type
+        # filter keeps the new report out of its own candidates.
         result = person_reports.insert_one(data)
         report_id = str(result.inserted_id)
-        
-        existing_reports = list(person_reports.find({'_id': {'$ne': result.inserted_id}, 'status': 'active'}))
-        for report in existing_reports:
-            report['_id'] = str(report['_id'])
-        
+        existing_reports = person_candidates(data)
         matches = SmartMatcher.match_persons(data, existing_reports)
         
         response = {
@@ -396,7 +731,9 @@ def submit_person():
         
         if matches:
             response['potential_matches'] = []
+            batch = []
             for match, score in matches:
+                match = client_report(match)
                 match_data = {
                     'match_details': match,
                     'similarity_score': round(score * 100, 2),
@@ -404,7 +741,7 @@ def submit_person():
                 }
                 response['potential_matches'].append(match_data)
                 
-                notification_queue.put({
+                batch.append({
                     'contact_number': data['contact'],
                     'match_type': 'person',
                     'match_details': match,
@@ -412,13 +749,15 @@ def submit_person():
                     'report_id': report_id
                 })
                 
-                notification_queue.put({
+                batch.append({
                     'contact_number': match['contact'],
                     'match_type': 'person',
-                    'match_details': data,
+                    'match_details': client_report(data),
                     'similarity_score': round(score * 100, 2),
                     'report_id': str(match['_id'])
                 })
+            
+            notification_pool.submit(WhatsAppNotifier.send_match_notifications, batch)
         
         return jsonify(response), 200
     except Exception as e:
@@ -435,14 +774,14 @@ def submit_item():
         data['status'] = 'active'
         data['created_at'] = datetime.now()
         data['has_photos'] = False
+        SmartMatcher.normalize_report(data)
         
+        # Insert before reading candidates: of two complementary reports submitted together,
+        # the later query is then guaranteed to see the other report. The opposite-type
+        # filter keeps the new report out of its own candidates.
         result = item_reports.insert_one(data)
         report_id = str(result.inserted_id)
-        
-        existing_reports = list(item_reports.find({'_id': {'$ne': result.inserted_id}, 'status': 'active'}))
-        for report in existing_reports:
-            report['_id'] = str(report['_id'])
-        
+        existing_reports = item_candidates(data)
         matches = SmartMatcher.match_items(data, existing_reports)
         
         response = {
@@ -453,7 +792,9 @@ def submit_item():
         
         if matches:
             response['potential_matches'] = []
+            batch = []
             for match, score in matches:
+                match = client_report(match)
                 match_data = {
                     'match_details': match,
                     'similarity_score': round(score * 100, 2),
@@ -461,7 +802,7 @@ def submit_item():
                 }
                 response['potential_matches'].append(match_data)
                 
-                notification_queue.put({
+                batch.append({
                     'contact_number': data['contact'],
                     'match_type': 'item',
                     'match_details': match,
@@ -469,13 +810,15 @@ def submit_item():
                     'report_id': report_id
                 })
                 
-                notification_queue.put({
+                batch.append({
                     'contact_number': match['contact'],
                     'match_type': 'item',
-                    'match_details': data,
+                    'match_details': client_report(data),
                     'similarity_score': round(score * 100, 2),
                     'report_id': str(match['_id'])
                 })
+            
+            notification_pool.submit(WhatsAppNotifier.send_match_notifications, batch)
         
         return jsonify(response), 200
     except Exception as e:
@@ -489,10 +832,7 @@ def get_persons():
         query = {'status': status_filter}
         if report_type != 'all':
             query['report_type'] = report_type
-        persons = list(person_reports.find(query).sort('created_at', -1).limit(50))
-        for person in persons:
-            person['_id'] = str(person['_id'])
-        return jsonify(persons), 200
+        return jsonify(list(person_reports.find(query, REPORT_LISTING_PROJECTION).sort('created_at', -1).limit(50))), 200
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
@@ -504,10 +844,7 @@ def get_items():
         query = {'status': status_filter}
         if report_type != 'all':
             query['report_type'] = report_type
-        items = list(item_reports.find(query).sort('created_at', -1).limit(50))
-        for item in items:
-            item['_id'] = str(item['_id'])
-        return jsonify(items), 200
+        return jsonify(list(item_reports.find(query, REPORT_LISTING_PROJECTION).sort('created_at', -1).limit(50))), 200
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
@@ -519,32 +856,32 @@ def my_reports():
             return jsonify({'error': 'Missing contact parameter'}), 400
         
         person_query = {'contact': contact, 'status': 'active'}
-        persons = list(person_reports.find(person_query).sort('created_at', -1))
+        persons = list(person_reports.find(person_query, REPORT_LISTING_PROJECTION).sort('created_at', -1))
         for p in persons:
-            p['_id'] = str(p['_id'])
             p['type'] = 'person'
-            if p['report_type'] == 'missing':
-                existing = list(person_reports.find({'report_type': 'found', 'status': 'active'}))
-                for e in existing:
-                    e['_id'] = str(e['_id'])
-                p['matches'] = SmartMatcher.match_persons(p, existing)
-            else:
-                p['matches'] = []
+            p['matches'] = []
+        
+        # One shared candidate pool per collection, scored against all of the user's reports at once
+        missing = [p for p in persons if p['report_type'] == 'missing']
+        if missing:
+            found_pool = list(person_reports.find({'report_type': 'found', 'status': 'active'}, PERSON_MATCH_PROJECTION))
+            for p, matches in zip(missing, SmartMatcher.match_persons_batch(missing, found_pool)):
+                p['matches'] = [(client_report(match), score) for match, score in matches]
         
         item_query = {'contact': contact, 'status': 'active'}
-        items = list(item_reports.find(item_query).sort('created_at', -1))
+        items = list(item_reports.find(item_query, REPORT_LISTING_PROJECTION).sort('created_at', -1))
         for i in items:
-            i['_id'] = str(i['_id'])
             i['type'] = 'item'
-            if i['report_type'] == 'lost':
-                existing = list(item_reports.find({'report_type': 'found', 'status': 'active'}))
-                for e in existing:
-                    e['_id'] = str(e['_id'])
-                i['matches'] = SmartMatcher.match_items(i, existing)
-            else:
-                i['matches'] = []
-        
-        reports = persons + items
+            i['matches'] = []
+        
+        lost = [i for i in items if i['report_type'] == 'lost']
+        if lost:
+            found_pool = list(item_reports.find({'report_type': 'found', 'status': 'active'}, ITEM_MATCH_PROJECTION))
+            for i, matches in zip(lost, SmartMatcher.match_items_batch(lost, found_pool)):
+                i['matches'] = [(client_report(match), score) for match, score in matches]
+        
+        # Scoring re-adds the normalized caches to the user's own reports, so they are stripped again here
+        reports = [client_report(report) for report in persons + items]
         return jsonify(reports), 200
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
@@ -584,35 +921,41 @@ def health_check():
 def help_center_portal():
     """Serve volunteer portal (your file is named help_centre.html)"""
     try:
-        with open('help_centre.html', 'r', encoding='utf-8') as file:
-            return file.read()
-    except FileNotFoundError:
+        return send_from_directory(app.root_path, 'help_centre.html', max_age=PORTAL_MAX_AGE)
+    except NotFound:
         return "Help Center Portal - Page not found"
 
+def count_by_type_and_status(collection):
+    """Document counts keyed by (report_type, status) in a single aggregation"""
+    pipeline = [{'$group': {'_id': {'report_type': '$report_type', 'status': '$status'}, 'n': {'$sum': 1}}}]
+    return {(row['_id'].get('report_type'), row['_id'].get('status')): row['n'] for row in collection.aggregate(pipeline)}
+
+def type_counts(counts, report_type):
+    return {
+        'total_count': sum(n for (rt, _), n in counts.items() if rt == report_type),
+        'active_count': counts.get((report_type, 'active'), 0)
+    }
+
 @app.route('/stats')
 def get_statistics():
     try:
-        missing_persons_count = person_reports.count_documents({'report_type': 'missing'})
-        missing_persons_active = person_reports.count_documents({'report_type': 'missing', 'status': 'active'})
-        found_persons_count = person_reports.count_documents({'report_type': 'found'})
-        found_persons_active = person_reports.count_documents({'report_type': 'found', 'status': 'active'})
-        lost_items_count = item_reports.count_documents({'report_type': 'lost'})
-        lost_items_active = item_reports.count_documents({'report_type': 'lost', 'status': 'active'})
-        found_items_count = item_reports.count_documents({'report_type': 'found'})
-        found_items_active = item_reports.count_documents({'report_type': 'found', 'status': 'active'})
-        notifications_sent = notifications.count_documents({'type': 'match_alert', 'status': 'sent'})
-        notifications_failed = notifications.count_documents({'type': 'match_alert', 'status': 'failed'})
+        person_counts = count_by_type_and_status(person_reports)
+        item_counts = count_by_type_and_status(item_reports)
+        notification_counts = {row['_id']: row['n'] for row in notifications.aggregate([
+            {'$match': {'type': 'match_alert'}},
+            {'$group': {'_id': '$status', 'n': {'$sum': 1}}}
+        ])}
         
         stats = {
             'persons': {
-                'missing': {'total_count': missing_persons_count, 'active_count': missing_persons_active},
-                'found': {'total_count': found_persons_count, 'active_count': found_persons_active}
+                'missing': type_counts(person_counts, 'missing'),
+                'found': type_counts(person_counts, 'found')
             },
             'items': {
-                'lost': {'total_count': lost_items_count, 'active_count': lost_items_active},
-                'found': {'total_count': found_items_count, 'active_count': found_items_active}
+                'lost': type_counts(item_counts, 'lost'),
+                'found': type_counts(item_counts, 'found')
             },
-            'notifications': {'sent': notifications_sent, 'failed': notifications_failed}
+            'notifications': {'sent': notification_counts.get('sent', 0), 'failed': notification_counts.get('failed', 0)}
         }
         return jsonify(stats), 200
     except Exception as e:
@@ -639,6 +982,7 @@ def resolve_report():
             )
         
         if result.modified_count > 0:
+            invalidate_reports_with_photos()
             return jsonify({'message': 'Report resolved successfully'}), 200
         else:
             return jsonify({'error': 'Report not found or already resolved'}), 404
@@ -657,13 +1001,14 @@ def notify_manual_match():
         similarity_score = data.get('similarity_score', 80)
         report_id = data.get('report_id', 'N/A')
         
-        notification_queue.put({
-            'contact_number': data['contact_number'],
-            'match_type': data['match_type'],
-            'match_details': data['match_details'],
-            'similarity_score': similarity_score,
-            'report_id': report_id
-        })
+        notification_pool.submit(
+            WhatsAppNotifier.send_match_notification,
+            data['contact_number'],
+            data['match_type'],
+            data['match_details'],
+            similarity_score,
+            report_id
+        )
         
         return jsonify({'message': 'Notification queued successfully'}), 200
     except Exception as e:
@@ -674,113 +1019,264 @@ def get_notifications():
     try:
         limit = int(request.args.get('limit', 20))
         recent_notifications = list(notifications.find().sort('sent_at', -1).limit(limit))
-        
-        for notification in recent_notifications:
-            notification['_id'] = str(notification['_id'])
-            if 'sent_at' in notification:
-                notification['sent_at'] = notification['sent_at'].isoformat()
-            if 'received_at' in notification:
-                notification['received_at'] = notification['received_at'].isoformat()
-        
         return jsonify(recent_notifications), 200
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 @app.route('/init-db')
 def initialize_database():
-    try:
-        person_reports.update_many({'status': {'$exists': False}}, {'$set': {'status': 'active'}})
-        item_reports.update_many({'status': {'$exists': False}}, {'$set': {'status': 'active'}})
-        if 'notifications' not in db.list_collection_names():
-            db.create_collection('notifications')
-        return jsonify({'message': 'Database initialized successfully'}), 200
-    except Exception as e:
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+    missing_status = {'status': {'$exists': False}}
+    # Reports saved before category_l existed are invisible to item_candidates until backfilled
+    missing_category_l = {'category': {'$type': 'string'}, 'category_l': {'$exists': False}}
+    backfills = {
+        person_reports: [(missing_status, {'$set': {'status': 'active'}})],
+        item_reports: [
+            (missing_status, {'$set': {'status': 'active'}}),
+            (missing_category_l, [{'$set': {'category_l': {'$toLower': '$category'}}}]),
+        ],
+    }
+    for collection, updates in backfills.items():
+        # Repeat inits find nothing to fix, so a limit=1 count skips the write entirely
+        pending = [UpdateMany(query, update) for query, update in updates
+                   if collection.count_documents(query, limit=1)]
+        if pending:
+            collection.bulk_write(pending, ordered=False)
+            invalidate_reports_with_photos()
+    ensure_indexes()
+    if 'notifications' not in db.list_collection_names():
+        db.create_collection('notifications')
+    return jsonify({'message': 'Database initialized successfully'}), 200
 
 @app.route('/upload-photo', methods=['POST'])
 def upload_photo():
-    try:
-        report_id = request.form.get('report_id')
-        report_type = request.form.get('report_type')
+    if request.mimetype != 'multipart/form-data':
+        return jsonify({'error': 'No photo provided'}), 400
+    report_id, report_type, file = parse_photo_upload()
+    # Checked before any file or database write so a bad request leaves nothing behind
+    if not _OBJECTID_RE.match(report_id):
+        return jsonify({'error': 'Invalid report_id'}), 400
+    if report_type not in ('person', 'item'):
+        return jsonify({'error': 'Invalid report_type'}), 400
+    
+    if file.multipart_filename is None:
+        return jsonify({'error': 'No photo provided'}), 400
+    
+    if file.multipart_filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    
+    if allowed_file(file.multipart_filename):
+        # The parsed upload buffer feeds the hash, the disk write and the cache
+        file_bytes = file.value
+        sha256 = hashlib.sha256(file_bytes).hexdigest()
+        # Identical bytes already on disk are shared instead of written again
+        duplicate = photos.find_one({'sha256': sha256}, {'filename': 1, 'filepath': 1})
+        # Files are moved into place complete, so an existing path is never a partial write
+        if duplicate and os.path.exists(duplicate['filepath']):
+            filename, filepath = duplicate['filename'], duplicate['filepath']
+            write_future = None
+        else:
+            filename = f"{uuid.uuid4().hex}_{secure_filename(file.multipart_filename)}"
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            write_future = file_pool.submit(write_photo_file, filepath, file_bytes)
         
-        if 'photo' not in request.files:
-            return jsonify({'error': 'No photo provided'}), 400
+        photo_data = {
+            'report_id': report_id,
+            'report_type': report_type,
+            'filename': filename,
+            'filepath': filepath,
+            'sha256': sha256,
+            'uploaded_at': datetime.now(),
+            'uploaded_by': 'user'
+        }
         
-        file = request.files['photo']
-        if file.filename == '':
-            return jsonify({'error': 'No selected file'}), 400
+        # Encode from the upload buffer so the first view doesn't have to re-read the file;
+        # duplicates reuse the original's inline copy (looked up by sha256) instead of storing another
+        image_data = None
+        if write_future is not None:
+            image_data = pybase64.b64encode(file_bytes).decode('ascii')
+            if len(file_bytes) <= INLINE_PHOTO_MAX_BYTES:
+                photo_data['b64'] = image_data
+        # Encoding overlaps the disk write; the document is only written once the file is on disk,
+        # so a failed write leaves no photo record pointing at a missing file
+        if write_future is not None:
+            write_future.result()
+        photo_id = photos.insert_one(photo_data).inserted_id
+        if image_data is not None and 'b64' not in photo_data:
+            cache_photo_data({str(photo_id): image_data})
         
-        if file and allowed_file(file.filename):
-            filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            photo_data = {
-                'report_id': report_id,
-                'report_type': report_type,
-                'filename': filename,
-                'filepath': filepath,
-                'uploaded_at': datetime.now(),
-                'uploaded_by': 'user'
-            }
-            
-            photos.insert_one(photo_data)
-            
-            if report_type == 'person':
-                person_reports.update_one(
-                    {'_id': ObjectId(report_id)},
-                    {'$set': {'has_photos': True}}
-                )
-            else:
-                item_reports.update_one(
-                    {'_id': ObjectId(report_id)},
-                    {'$set': {'has_photos': True}}
-                )
-            
-            return jsonify({'message': 'Photo uploaded successfully', 'filename': filename}), 200
+        if report_type == 'person':
+            person_reports.update_one(
+                {'_id': ObjectId(report_id)},
+                {'$set': {'has_photos': True}}
+            )
         else:
-            return jsonify({'error': 'Invalid file type'}), 400
-    except Exception as e:
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+            item_reports.update_one(
+                {'_id': ObjectId(report_id)},
+                {'$set': {'has_photos': True}}
+            )
+        invalidate_reports_with_photos()
+        
+        return jsonify({'message': 'Photo uploaded successfully', 'filename': filename}), 200
+    else:
+        return jsonify({'error': 'Invalid file type'}), 400
+
+@app.route('/photo/<photo_id>')
+def get_photo(photo_id):
+    if not _OBJECTID_RE.match(photo_id):
+        return jsonify({'error': 'Photo not found'}), 404
+    photo = photos.find_one({'_id': ObjectId(photo_id)}, {'filepath': 1})
+    if not photo:
+        return jsonify({'error': 'Photo not found'}), 404
+    try:
+        # conditional=True answers Range and If-None-Match/If-Modified-Since requests
+        response = send_file(os.path.abspath(photo['filepath']), conditional=True,
+                             etag=photo_id, max_age=PHOTO_MAX_AGE)
+    except FileNotFoundError:
+        return jsonify({'error': 'Photo file missing'}), 404
+    response.cache_control.immutable = True
+    return response
+
+# Aggregation expression for a photo document's /photo/<id> URL
+PHOTO_URL_EXPR = {'$concat': ['/photo/', {'$toString': '$_id'}]}
+
+def etag_matches(etag):
+    """If-None-Match check that also accepts the etag:<algorithm> form Flask-Compress sends out"""
+    algorithms = app.config['COMPRESS_ALGORITHM'] + app.config['COMPRESS_ALGORITHM_STREAMING']
+    return any(request.if_none_match.contains(tag) for tag in [etag] + [f"{etag}:{algorithm}" for algorithm in algorithms])
+
+def photo_list_etag(photo_list, embed):
+    """Photos are only ever added to a report, so the count and newest upload identify the list"""
+    newest = max((photo['uploaded_at'] for photo in photo_list), default=None)
+    return f"{len(photo_list)}-{newest.isoformat() if newest else 'none'}{'-embed' if embed else ''}"
+
+@lru_cache(maxsize=1024)
+def map_photo_file(filepath):
+    """Read-only mapping of a stored photo, kept per worker; stored photos are never rewritten"""
+    fd = os.open(filepath, os.O_RDONLY)
+    try:
+        if os.fstat(fd).st_size == 0:
+            return b''
+        return mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    finally:
+        # mmap keeps its own descriptor
+        os.close(fd)
+
+# Multiple of 3 so every chunk encodes to base64 without padding
+PHOTO_ENCODE_CHUNK_SIZE = 3 * 16 * 1024
+
+def stream_embedded_photos(photo_list):
+    """Yield the embedded photo list as a JSON array, one photo and one base64 chunk at a time"""
+    photo_ids = [str(photo['_id']) for photo in photo_list]
+    redis_hits = dict(zip(photo_ids, cached_photo_data(photo_ids)))
+    yield b'['
+    for index, photo in enumerate(photo_list):
+        photo_id = str(photo['_id'])
+        filepath = photo.pop('filepath')
+        sha256 = photo.pop('sha256', None)
+        image_data = redis_hits.get(photo_id)
+        if image_data is None and sha256:
+            # Inline payloads are fetched one photo at a time so only one is ever held;
+            # duplicates share the copy stored with the first upload of the same bytes
+            inline = photos.find_one({'sha256': sha256, 'b64': {'$exists': True}}, {'b64': 1, '_id': 0})
+            image_data = inline['b64'] if inline else None
+        mapped = None
+        if image_data is None:
+            # Resolved before any of this entry is sent, so a missing file becomes null rather than broken JSON
+            try:
+                mapped = memoryview(map_photo_file(filepath))
+            except OSError as e:
+                print(f"❌ Photo file unavailable for {photo_id}: {e}")
+        # Metadata object with its closing brace swapped for the image_data member
+        yield (b',' if index else b'') + orjson.dumps(photo, default=OrjsonProvider._default)[:-1] + b',"image_data":'
+        if image_data is not None:
+            yield b'"' + image_data.encode('ascii') + b'"}'
+        elif mapped is None:
+            yield b'null}'
+        else:
+            yield b'"'
+            # Only this photo's encoding is held, and only when it will be cached
+            encoded = [] if redis_client is not None else None
+            for start in range(0, len(mapped), PHOTO_ENCODE_CHUNK_SIZE):
+                chunk = pybase64.b64encode(mapped[start:start + PHOTO_ENCODE_CHUNK_SIZE])
+                if encoded is not None:
+                    encoded.append(chunk)
+                yield chunk
+            if encoded is not None:
+                cache_photo_data({photo_id: b''.join(encoded)})
+            yield b'"}'
+    yield b']'
 
 @app.route('/get-photos/<report_id>')
 def get_photos(report_id):
-    try:
-        photo_list = list(photos.find({'report_id': report_id}))
-        for photo in photo_list:
-            photo['_id'] = str(photo['_id'])
-            with open(photo['filepath'], 'rb') as img_file:
-                photo['image_data'] = base64.b64encode(img_file.read()).decode('utf-8')
-            del photo['filepath']
-        return jsonify(photo_list), 200
-    except Exception as e:
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+    # Metadata + URLs by default; ?embed=1 keeps the old inline base64 payloads
+    embed = request.args.get('embed') == '1'
+    if embed:
+        # b64 stays in MongoDB until the generator asks for it
+        photo_list = list(photos.find({'report_id': report_id}, {'b64': 0}, batch_size=500))
+    else:
+        # The url is built server-side and filepath never leaves the database
+        photo_list = list(photos.aggregate([
+            {'$match': {'report_id': report_id}},
+            {'$addFields': {'url': PHOTO_URL_EXPR}},
+            {'$project': PHOTO_LISTING_PROJECTION},
+        ], batchSize=500))
+    etag = photo_list_etag(photo_list, embed)
+    # Revalidation is answered before any photo is read or encoded
+    if etag_matches(etag):
+        response = app.response_class(status=304)
+    elif not embed:
+        response = jsonify(photo_list)
+    else:
+        response = app.response_class(stream_with_context(stream_embedded_photos(photo_list)),
+                                      mimetype='application/json')
+    # New uploads change the list, so clients must revalidate each time
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+def reports_with_photos_pipeline(report_type):
+    """Reports that have photos, each with its photo list joined in (photos.report_id is the string _id)"""
+    return [
+        {'$match': {'has_photos': True}},
+        {'$project': REPORT_LISTING_PROJECTION},
+        {'$lookup': {
+            'from': 'photos',
+            'let': {'report_id': {'$toString': '$_id'}},
+            'pipeline': [
+                {'$match': {'$expr': {'$eq': ['$report_id', '$$report_id']}}},
+                {'$project': {'_id': 1, 'filename': 1, 'url': PHOTO_URL_EXPR}},
+            ],
+            'as': 'photos',
+        }},
+        {'$addFields': {'type': report_type}},
+    ]
 
 @app.route('/reports-with-photos')
 def get_reports_with_photos():
-    try:
-        person_reports_with_photos = list(person_reports.find({'has_photos': True}))
-        for report in person_reports_with_photos:
-            report['_id'] = str(report['_id'])
-            report['type'] = 'person'
-        
-        item_reports_with_photos = list(item_reports.find({'has_photos': True}))
-        for report in item_reports_with_photos:
-            report['_id'] = str(report['_id'])
-            report['type'] = 'item'
-        
-        all_reports = person_reports_with_photos + item_reports_with_photos
-        return jsonify(all_reports), 200
-    except Exception as e:
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(REPORTS_WITH_PHOTOS_CACHE_KEY)
+            if cached is not None:
+                return app.response_class(cached, mimetype='application/json'), 200
+        except Exception as e:
+            print(f"❌ Error reading reports cache: {e}")
+    
+    # Both collections come back on a single cursor, persons first as before
+    pipeline = reports_with_photos_pipeline('person') + [
+        {'$unionWith': {'coll': item_reports.name, 'pipeline': reports_with_photos_pipeline('item')}},
+    ]
+    payload = orjson.dumps(list(person_reports.aggregate(pipeline, batchSize=200)), default=OrjsonProvider._default)
+    if redis_client is not None:
+        try:
+            redis_client.setex(REPORTS_WITH_PHOTOS_CACHE_KEY, REPORTS_WITH_PHOTOS_CACHE_TTL, payload)
+        except Exception as e:
+            print(f"❌ Error caching reports: {e}")
+    return app.response_class(payload, mimetype='application/json'), 200
 if __name__ == '__main__':
-    notification_thread = threading.Thread(target=notification_worker, daemon=True)
-    notification_thread.start()
-    print("✅ Notification worker thread started")
-
     print("\n🌐 Open the portals in your browser:")
     print("   🟢 User Portal:   http://127.0.0.1:5000/")
     print("   🟢 Help Center:   http://127.0.0.1:5000/help-center\n")
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(debug=os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true'), host='0.0.0.0', port=5000)
 
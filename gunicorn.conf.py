@@ -0,0 +1,16 @@
+# Gunicorn settings, picked up automatically by `gunicorn app:app`
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+
+# gthread workers: I/O waits (MongoDB, disk, Twilio) overlap on each worker's threads.
+# Report matching is CPU-bound but single-threaded per request (rapidfuzz releases the
+# GIL), so at most workers x threads matcher threads run at once. One worker per core
+# gives each core one process; the threads cover time spent waiting on I/O.
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.getenv('THREADS', 8))
+
+# Keep client connections open between requests (dashboard polling, photo grids)
+keepalive = int(os.getenv('KEEPALIVE', 30))